@@ -3,144 +3,194 @@ Neo4j Prerequisite Relationship Loader
 Loads JSON prerequisite data and creates PREREQUISITE relationships in Neo4j
 """
 
-import json
-from typing import Dict, List
-from neo4j import GraphDatabase
+import orjson
+import ijson
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from loader_base import Neo4jLoaderBase
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows sent per UNWIND query
+BATCH_SIZE = 10_000
 
-class Neo4jPrerequisiteLoader:
-    def __init__(self, uri: str, username: str, password: str):
-        """Initialize Neo4j connection"""
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
-        logger.info(f"Connected to Neo4j at {uri}")
-
-    def close(self):
-        """Close Neo4j connection"""
-        self.driver.close()
 
+class Neo4jPrerequisiteLoader(Neo4jLoaderBase):
     def load_json_data(self, filename: str) -> Dict[str, List[Dict]]:
         """Load prerequisite data from JSON file"""
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(filename, 'rb') as f:
+                data = orjson.loads(f.read())
             logger.info(f"Loaded {len(data)} courses from {filename}")
             return data
         except FileNotFoundError:
             logger.error(f"File {filename} not found")
             return {}
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Invalid JSON in {filename}: {e}")
             return {}
 
+    def iter_courses(self, filename: str) -> Iterator[Tuple[str, List[Dict]]]:
+        """Stream (course_id, and_groups) pairs from JSON file one course at a time"""
+        try:
+            with open(filename, 'rb') as f:
+                yield from ijson.kvitems(f, '', use_float=True)
+        except FileNotFoundError:
+            logger.error(f"File {filename} not found")
+        except ijson.JSONError as e:
+            logger.error(f"Invalid JSON in {filename}: {e}")
+
     def clear_prerequisite_relationships(self):
         """Remove all existing PREREQUISITE relationships"""
-        with self.driver.session() as session:
-            result = session.run(
-                "MATCH ()-[r:PREREQUISITE]->() DELETE r RETURN count(r) as deleted")
-            deleted_count = result.single()["deleted"]
+        with self.driver.session(database=self.database) as session:
+            deleted_count = session.execute_write(
+                lambda tx: tx.run(
+                    "MATCH ()-[r:PREREQUISITE]->() DELETE r"
+                ).consume().counters.relationships_deleted)
             logger.info(
                 f"Deleted {deleted_count} existing PREREQUISITE relationships")
 
-    def create_prerequisite_relationships(self, prereq_data: Dict[str, List[Dict]]):
-        """Create all PREREQUISITE relationships from JSON data"""
-        total_relationships = 0
+    def create_prerequisite_relationships(
+            self, prereq_data: Union[Dict[str, List[Dict]], Iterable[Tuple[str, List[Dict]]]]) -> int:
+        """Create all PREREQUISITE relationships from JSON data
 
-        with self.driver.session() as session:
-            for target_course_id, and_groups in prereq_data.items():
-                logger.info(f"Processing course: {target_course_id}")
-
-                for group_index, and_group in enumerate(and_groups):
-                    group_id = f"g{group_index + 1}"
-                    courses = and_group.get("courses", [])
-                    can_take_concurrent = and_group.get(
-                        "canBeTakenConcurrently", False)
-
-                    # Determine relationship type
-                    relationship_type = "CHOICE" if len(
-                        courses) > 1 else "REQUIRED"
-
-                    logger.info(f"  Group {group_id}: {
-                                relationship_type} - {len(courses)} courses")
-
-                    for course in courses:
-                        prereq_name = course.get("coursename")
-                        prereq_id = course.get("id")
-                        minimum_grade = course.get("minimum_grade", "D")
-
-                        # Create the relationship
-                        relationship_created = self._create_single_relationship(
-                            session,
-                            prereq_name,
-                            prereq_id,
-                            target_course_id,
-                            group_id,
-                            relationship_type,
-                            minimum_grade,
-                            can_take_concurrent
-                        )
-
-                        if relationship_created:
-                            total_relationships += 1
-                            logger.info(
-                                f"    ✅ {prereq_name} -> {target_course_id}")
-                        else:
-                            logger.warning(f"    ❌ Failed: {
-                                           prereq_name} -> {target_course_id}")
+        Accepts the loaded dict or a stream of (course_id, and_groups) pairs
+        from iter_courses; returns the number of relationships created.
+        """
+        if isinstance(prereq_data, dict):
+            prereq_data = prereq_data.items()
+
+        # One UNWIND query per batch instead of one round-trip per edge.
+        # Rows are produced lazily so batches flush while the input streams;
+        # a single writer thread sends each batch while the next is built.
+        # Writes stay serial because every CREATE locks both the target and
+        # the prerequisite node, and popular prerequisites (MATH 121, ...)
+        # appear under most targets, so concurrent batches would contend for
+        # the same locks however the rows were partitioned.
+        total_rows = 0
+        total_relationships = 0
+        failed_rows: List[Dict] = []
+        rows = self._iter_relationship_rows(prereq_data)
+        pending: Optional[Future] = None
+
+        def collect(future: Future):
+            nonlocal total_relationships
+            created, failed = future.result()
+            total_relationships += created
+            failed_rows.extend(failed)
+
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            while batch := list(itertools.islice(rows, BATCH_SIZE)):
+                total_rows += len(batch)
+                if pending is not None:
+                    collect(pending)
+                pending = writer.submit(self._write_batch, batch)
+
+            if pending is not None:
+                collect(pending)
 
         logger.info(
-            f"Created {total_relationships} PREREQUISITE relationships")
+            f"Created {total_relationships} PREREQUISITE relationships from {total_rows} rows")
+        if failed_rows:
+            raise RuntimeError(
+                f"{len(failed_rows)} of {total_rows} PREREQUISITE rows could not be written")
+        return total_relationships
 
-    def _create_single_relationship(self, session, prereq_name: str, prereq_id: str,
-                                    target_id: str, group_id: str, relationship_type: str,
-                                    minimum_grade: str, can_take_concurrent: bool) -> bool:
-        """Create a single PREREQUISITE relationship"""
+    def _write_batch(self, batch: List[Dict]) -> Tuple[int, List[Dict]]:
+        """Write one batch in its own session
+
+        Returns the relationships created and the rows that failed.
+        """
+        with self.driver.session(database=self.database) as session:
+            created, failed_rows = self._write_rows(
+                session, self._create_relationship_batch, batch)
 
-        # First try to match by course name, then by ID
+        logger.info(
+            f"Batch: {created} relationships created from {len(batch)} rows")
+        return created, failed_rows
+
+    @staticmethod
+    def _iter_relationship_rows(prereq_data: Iterable[Tuple[str, List[Dict]]]) -> Iterator[Dict]:
+        """Flatten (course_id, and_groups) pairs into relationship rows"""
+        # Per-course detail is DEBUG only; batches are logged at INFO
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        for target_course_id, and_groups in prereq_data:
+            if debug:
+                logger.debug("Processing course: %s", target_course_id)
+
+            for group_index, and_group in enumerate(and_groups):
+                group_id = f"g{group_index + 1}"
+                courses = and_group.get("courses", [])
+                can_take_concurrent = and_group.get(
+                    "canBeTakenConcurrently", False)
+
+                # Determine relationship type
+                relationship_type = "CHOICE" if len(
+                    courses) > 1 else "REQUIRED"
+
+                if debug:
+                    logger.debug("  Group %s: %s - %d courses",
+                                 group_id, relationship_type, len(courses))
+
+                for course in courses:
+                    yield {
+                        "prereq_name": course.get("coursename"),
+                        "prereq_id": course.get("id"),
+                        "target_id": target_course_id,
+                        "group_id": group_id,
+                        "relationship_type": relationship_type,
+                        "minimum_grade": course.get("minimum_grade", "D"),
+                        "can_take_concurrent": can_take_concurrent
+                    }
+
+    @staticmethod
+    def _create_relationship_batch(tx, rows: List[Dict]) -> int:
+        """Create PREREQUISITE relationships for a batch of rows"""
+
+        # Match the prerequisite course by name or by ID. The UNION of two
+        # hinted lookups forces an index seek on each side instead of a
+        # label scan; LIMIT 1 keeps the first match per row.
         cypher_query = """
-        // Try to find prerequisite course by name first, then by ID
-        OPTIONAL MATCH (prereq:Course) WHERE prereq.name = $prereq_name OR prereq.id = $prereq_id
-        OPTIONAL MATCH (target:Course) WHERE target.id = $target_id
-        
-        WITH prereq, target
-        WHERE prereq IS NOT NULL AND target IS NOT NULL
-        
+        UNWIND $rows AS row
+        MATCH (target:Course {id: row.target_id})
+        USING INDEX target:Course(id)
+        CALL {
+            WITH row
+            CALL {
+                WITH row
+                MATCH (prereq:Course) USING INDEX prereq:Course(name)
+                WHERE prereq.name = row.prereq_name
+                RETURN prereq
+                UNION
+                WITH row
+                MATCH (prereq:Course) USING INDEX prereq:Course(id)
+                WHERE prereq.id = row.prereq_id
+                RETURN prereq
+            }
+            RETURN prereq
+            LIMIT 1
+        }
+
         CREATE (prereq)-[:PREREQUISITE {
-            group_id: $group_id,
-            relationship_type: $relationship_type,
-            minimum_grade: $minimum_grade,
-            can_take_concurrent: $can_take_concurrent
+            group_id: row.group_id,
+            relationship_type: row.relationship_type,
+            minimum_grade: row.minimum_grade,
+            can_take_concurrent: row.can_take_concurrent
         }]->(target)
-        
-        RETURN prereq.name as prereq_name, target.name as target_name
         """
 
-        try:
-            result = session.run(cypher_query, {
-                "prereq_name": prereq_name,
-                "prereq_id": prereq_id,
-                "target_id": target_id,
-                "group_id": group_id,
-                "relationship_type": relationship_type,
-                "minimum_grade": minimum_grade,
-                "can_take_concurrent": can_take_concurrent
-            })
-
-            record = result.single()
-            return record is not None
-
-        except Exception as e:
-            logger.error(f"Error creating relationship {
-                         prereq_name} -> {target_id}: {e}")
-            return False
+        # Write-only query: read the count from the summary, not a record
+        summary = tx.run(cypher_query, rows=rows).consume()
+        return summary.counters.relationships_created
 
     def verify_relationships(self) -> Dict[str, int]:
         """Verify the created relationships"""
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # Count total relationships
             result = session.run(
                 "MATCH ()-[r:PREREQUISITE]->() RETURN count(r) as total")
@@ -177,7 +227,7 @@ class Neo4jPrerequisiteLoader:
 
     def get_sample_course_prerequisites(self, course_id: str) -> List[Dict]:
         """Get prerequisites for a sample course"""
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run("""
                 MATCH (prereq:Course)-[r:PREREQUISITE]->(target:Course {id: $course_id})
                 RETURN r.group_id as group_id, 
@@ -206,10 +256,10 @@ def main():
     loader = Neo4jPrerequisiteLoader(NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD)
 
     try:
-        # Load JSON data
-        prereq_data = loader.load_json_data(JSON_FILENAME)
+        # Peek at the first course; the file is streamed, not loaded whole
+        sample_course = next(loader.iter_courses(JSON_FILENAME), None)
 
-        if not prereq_data:
+        if sample_course is None:
             logger.error("No data loaded. Exiting.")
             return
 
@@ -219,16 +269,17 @@ def main():
         if clear_existing == 'y':
             loader.clear_prerequisite_relationships()
 
-        # Create new relationships
+        # Create new relationships, streaming courses from the JSON file
         logger.info("Creating PREREQUISITE relationships...")
-        loader.create_prerequisite_relationships(prereq_data)
+        loader.create_prerequisite_relationships(
+            loader.iter_courses(JSON_FILENAME))
 
         # Verify results
         stats = loader.verify_relationships()
 
         # Show sample
-        if prereq_data:
-            sample_course_id = list(prereq_data.keys())[0]
+        if sample_course:
+            sample_course_id = sample_course[0]
             logger.info(f"\nSample prerequisites for course {
                         sample_course_id}:")
             sample_prereqs = loader.get_sample_course_prerequisites(
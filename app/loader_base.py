@@ -0,0 +1,102 @@
+"""
+Shared Neo4j connection handling for the relationship loaders
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+from neo4j import GraphDatabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Neo4jLoaderBase:
+    """Driver setup and Course indexes common to the Neo4j loaders"""
+
+    # Drivers shared across instances of every loader, keyed by (uri, username)
+    _shared_drivers: Dict[Tuple[str, str], Any] = {}
+
+    def __init__(self, uri: str, username: str, password: str, database: str = "neo4j",
+                 max_connection_pool_size: int = 50,
+                 connection_acquisition_timeout: float = 60.0,
+                 shared: bool = False):
+        """Initialize Neo4j connection
+
+        With shared=True the driver (and its connection pool) is reused
+        across loaders for the same uri and username, see get_shared.
+        """
+        driver_args = (uri, username, password, max_connection_pool_size,
+                       connection_acquisition_timeout)
+        self.shared = shared
+        self.driver = self.get_shared(
+            *driver_args) if shared else self._create_driver(*driver_args)
+        # Naming the database skips the home-database lookup per session
+        self.database = database
+        logger.info(f"Connected to Neo4j at {uri}")
+        self.create_indexes()
+
+    @staticmethod
+    def _create_driver(uri: str, username: str, password: str,
+                       max_connection_pool_size: int = 50,
+                       connection_acquisition_timeout: float = 60.0):
+        """Create a driver with a pool sized for bulk ingests"""
+        return GraphDatabase.driver(
+            uri, auth=(username, password),
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+            connection_timeout=15,
+            keep_alive=True)
+
+    @classmethod
+    def get_shared(cls, uri: str, username: str, password: str,
+                   max_connection_pool_size: int = 50,
+                   connection_acquisition_timeout: float = 60.0):
+        """Return the driver shared per (uri, username), creating it on first use"""
+        key = (uri, username)
+        driver = cls._shared_drivers.get(key)
+        if driver is None:
+            driver = cls._create_driver(uri, username, password, max_connection_pool_size,
+                                        connection_acquisition_timeout)
+            cls._shared_drivers[key] = driver
+        return driver
+
+    def close(self):
+        """Close Neo4j connection (shared drivers stay open for other loaders)"""
+        if not self.shared:
+            self.driver.close()
+
+    def create_indexes(self):
+        """Create range indexes used to look up Course nodes"""
+        with self.driver.session(database=self.database) as session:
+            session.run(
+                "CREATE RANGE INDEX course_id_idx IF NOT EXISTS FOR (c:Course) ON (c.id)")
+            session.run(
+                "CREATE RANGE INDEX course_name_idx IF NOT EXISTS FOR (c:Course) ON (c.name)")
+            # New indexes populate in the background; queries hinting them
+            # with USING INDEX fail until they are online
+            session.run("CALL db.awaitIndexes()").consume()
+        logger.info("Ensured range indexes on Course.id and Course.name")
+
+    @staticmethod
+    def _write_rows(session, write_batch: Callable[[Any, List[Dict]], int],
+                    rows: List[Dict]) -> Tuple[int, List[Dict]]:
+        """Write rows with write_batch(tx, rows) in one transaction
+
+        If the batch fails, each row is retried in its own transaction so
+        only the offending rows are lost. Returns the number of relationships
+        created and the rows that could not be written.
+        """
+        try:
+            return session.execute_write(write_batch, rows), []
+        except Exception as e:
+            logger.warning(
+                f"Batch of {len(rows)} rows failed, retrying row by row: {e}")
+
+        created = 0
+        failed_rows = []
+        for row in rows:
+            try:
+                created += session.execute_write(write_batch, [row])
+            except Exception as e:
+                logger.error(f"Failed to write row {row}: {e}")
+                failed_rows.append(row)
+        return created, failed_rows
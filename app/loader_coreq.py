@@ -3,127 +3,107 @@ Neo4j Corequisite Relationship Loader
 Loads JSON corequisite data and creates COREQUISITE relationships in Neo4j
 """
 
-import json
-from typing import Dict, List
-from neo4j import GraphDatabase
+import orjson
+import itertools
+from typing import Dict, List, Tuple
+from loader_base import Neo4jLoaderBase
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Corequisite pairs sent per UNWIND query
+BATCH_SIZE = 10_000
 
-class Neo4jCorequisiteLoader:
-    def __init__(self, uri: str, username: str, password: str):
-        """Initialize Neo4j connection"""
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
-        logger.info(f"Connected to Neo4j at {uri}")
-
-    def close(self):
-        """Close Neo4j connection"""
-        self.driver.close()
 
+class Neo4jCorequisiteLoader(Neo4jLoaderBase):
     def load_json_data(self, filename: str) -> Dict[str, List[str]]:
         """Load corequisite data from JSON file"""
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(filename, 'rb') as f:
+                data = orjson.loads(f.read())
             logger.info(f"Loaded {len(data)} courses from {filename}")
             return data
         except FileNotFoundError:
             logger.error(f"File {filename} not found")
             return {}
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Invalid JSON in {filename}: {e}")
             return {}
 
     def clear_corequisite_relationships(self):
         """Remove all existing COREQUISITE relationships"""
-        with self.driver.session() as session:
-            result = session.run(
-                "MATCH ()-[r:COREQUISITE]->() DELETE r RETURN count(r) as deleted")
-            deleted_count = result.single()["deleted"]
+        with self.driver.session(database=self.database) as session:
+            deleted_count = session.execute_write(
+                lambda tx: tx.run(
+                    "MATCH ()-[r:COREQUISITE]->() DELETE r"
+                ).consume().counters.relationships_deleted)
             logger.info(
                 f"Deleted {deleted_count} existing COREQUISITE relationships")
 
     def create_corequisite_relationships(self, coreq_data: Dict[str, List[str]]):
         """Create all COREQUISITE relationships from JSON data"""
-        total_relationships = 0
+        # Each unordered pair is written once; a dict keeps input order
+        unique_pairs: Dict[Tuple[str, str], None] = {}
+        # Per-course detail is DEBUG only; batches are logged at INFO
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        for course_id, corequisite_ids in coreq_data.items():
+            if debug:
+                logger.debug("Processing course: %s", course_id)
+                logger.debug("  Corequisites: %d courses",
+                             len(corequisite_ids))
+
+            # "A lists B" and "B lists A" are the same pair
+            for coreq_id in corequisite_ids:
+                unique_pairs[tuple(sorted((course_id, coreq_id)))] = None
 
-        with self.driver.session() as session:
-            for course_id, corequisite_ids in coreq_data.items():
-                logger.info(f"Processing course: {course_id}")
-                logger.info(f"  Corequisites: {len(corequisite_ids)} courses")
-
-                for coreq_id in corequisite_ids:
-                    # Create bidirectional corequisite relationships
-                    # Course A -> Course B (corequisite)
-                    relationship_created_1 = self._create_single_relationship(
-                        session, course_id, coreq_id
-                    )
-
-                    # Course B -> Course A (corequisite)
-                    relationship_created_2 = self._create_single_relationship(
-                        session, coreq_id, course_id
-                    )
-
-                    if relationship_created_1:
-                        total_relationships += 1
-                        logger.info(
-                            f"    ✅ {course_id} <-> {coreq_id} (forward)")
-                    else:
-                        logger.warning(f"    ❌ Failed: {
-                                       course_id} -> {coreq_id}")
-
-                    if relationship_created_2:
-                        total_relationships += 1
-                        logger.info(
-                            f"    ✅ {coreq_id} <-> {course_id} (reverse)")
-                    else:
-                        logger.warning(f"    ❌ Failed: {
-                                       coreq_id} -> {course_id}")
+        # Each row creates both directions of the pair
+        rows = [{"a": a, "b": b} for a, b in unique_pairs]
+
+        # One UNWIND query per batch instead of two round-trips per pair
+        total_relationships = 0
+        failed_rows: List[Dict] = []
+        rows_iter = iter(rows)
+
+        with self.driver.session(database=self.database) as session:
+            while batch := list(itertools.islice(rows_iter, BATCH_SIZE)):
+                created, failed = self._write_rows(
+                    session, self._create_relationship_batch, batch)
+                total_relationships += created
+                failed_rows.extend(failed)
+                logger.info(
+                    f"Batch: {created} relationships created from {len(batch)} pairs")
 
         logger.info(f"Created {total_relationships} COREQUISITE relationships")
+        if failed_rows:
+            raise RuntimeError(
+                f"{len(failed_rows)} of {len(rows)} corequisite pairs could not be written")
 
-    def _create_single_relationship(self, session, from_course_id: str, to_course_id: str) -> bool:
-        """Create a single COREQUISITE relationship"""
+    @staticmethod
+    def _create_relationship_batch(tx, rows: List[Dict]) -> int:
+        """Create bidirectional COREQUISITE relationships for a batch of pairs"""
 
+        # MERGE only creates a relationship if it doesn't already exist
         cypher_query = """
-        // Find both courses by ID
-        MATCH (from_course:Course {id: $from_course_id})
-        MATCH (to_course:Course {id: $to_course_id})
-        
-        // Check if relationship already exists to avoid duplicates
-        OPTIONAL MATCH (from_course)-[existing:COREQUISITE]->(to_course)
-        
-        WITH from_course, to_course, existing
-        WHERE existing IS NULL  // Only create if relationship doesn't exist
-        
-        CREATE (from_course)-[:COREQUISITE {
-            relationship_type: "COREQUISITE",
-            created_at: datetime()
-        }]->(to_course)
-        
-        RETURN from_course.id as from_id, to_course.id as to_id
-        """
+        UNWIND $rows AS row
+        MATCH (a:Course {id: row.a})
+        MATCH (b:Course {id: row.b})
 
-        try:
-            result = session.run(cypher_query, {
-                "from_course_id": from_course_id,
-                "to_course_id": to_course_id
-            })
+        MERGE (a)-[forward:COREQUISITE {relationship_type: "COREQUISITE"}]->(b)
+        ON CREATE SET forward.created_at = datetime()
 
-            record = result.single()
-            return record is not None
+        MERGE (b)-[reverse:COREQUISITE {relationship_type: "COREQUISITE"}]->(a)
+        ON CREATE SET reverse.created_at = datetime()
+        """
 
-        except Exception as e:
-            logger.error(f"Error creating relationship {
-                         from_course_id} -> {to_course_id}: {e}")
-            return False
+        summary = tx.run(cypher_query, rows=rows).consume()
+        return summary.counters.relationships_created
 
     def verify_relationships(self) -> Dict[str, int]:
         """Verify the created relationships"""
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # Count total relationships
             result = session.run(
                 "MATCH ()-[r:COREQUISITE]->() RETURN count(r) as total")
@@ -158,7 +138,7 @@ class Neo4jCorequisiteLoader:
 
     def get_course_corequisites(self, course_id: str) -> List[Dict]:
         """Get corequisites for a specific course"""
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run("""
                 MATCH (course:Course {id: $course_id})-[r:COREQUISITE]->(coreq:Course)
                 RETURN coreq.id as coreq_id, 
@@ -171,7 +151,7 @@ class Neo4jCorequisiteLoader:
 
     def find_mutual_corequisites(self) -> List[Dict]:
         """Find courses that have mutual corequisite relationships"""
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run("""
                 MATCH (a:Course)-[:COREQUISITE]->(b:Course)
                 MATCH (b)-[:COREQUISITE]->(a)
@@ -219,7 +199,7 @@ def main():
 
         # Show sample corequisites
         if coreq_data:
-            sample_course_id = list(coreq_data.keys())[0]
+            sample_course_id = next(iter(coreq_data))
             logger.info(f"\nSample corequisites for course {
                         sample_course_id}:")
             sample_coreqs = loader.get_course_corequisites(sample_course_id)
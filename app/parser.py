@@ -1,5 +1,9 @@
-from lark import Lark, Transformer
-from typing import List, Dict, Any, Optional
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from lark import Lark, Transformer, v_args
+from typing import List, Dict, Any, Callable, Iterator, NamedTuple, Optional, Tuple
 
 PREREQUISITE_GRAMMAR = r"""
     start: or_expression
@@ -39,8 +43,20 @@ PREREQUISITE_GRAMMAR = r"""
 
 # AST Node Classes
 
+# Nodes are never mutated after parsing, so repeated course codes and grades
+# share one instance each (see CourseCode.get / GradeRequirement.get)
+_CC_CACHE: Dict[Tuple[str, str], 'CourseCode'] = {}
+_GRADE_CACHE: Dict[str, 'GradeRequirement'] = {}
+# Logical paths repeat across courses (e.g. (('and', 0),)), so each distinct
+# path is built once and shared: child paths are keyed by the id of their
+# parent path, which is itself cached (or the empty root tuple) and so stays
+# alive, plus the (kind, index) step
+_PATH_CACHE: Dict[Tuple[int, str, int], Tuple] = {}
+
 
 class CourseCode:
+    __slots__ = ('subject', 'number')
+
     def __init__(self, subject: str, number: str):
         self.subject = subject
         self.number = number
@@ -51,16 +67,37 @@ class CourseCode:
     def __repr__(self):
         return f"CourseCode({self.subject}, {self.number})"
 
+    @classmethod
+    def get(cls, subject: str, number: str) -> 'CourseCode':
+        """Return the shared instance for this course code"""
+        key = (subject, number)
+        course = _CC_CACHE.get(key)
+        if course is None:
+            course = _CC_CACHE[key] = cls(sys.intern(subject), sys.intern(number))
+        return course
+
 
 class GradeRequirement:
+    __slots__ = ('grade',)
+
     def __init__(self, grade: str):
         self.grade = grade
 
     def __repr__(self):
         return f"GradeRequirement({self.grade})"
 
+    @classmethod
+    def get(cls, grade: str) -> 'GradeRequirement':
+        """Return the shared instance for this grade value"""
+        requirement = _GRADE_CACHE.get(grade)
+        if requirement is None:
+            requirement = _GRADE_CACHE[grade] = cls(sys.intern(grade))
+        return requirement
+
 
 class HelpText:
+    __slots__ = ('content',)
+
     def __init__(self, content: str):
         self.content = content.strip()
 
@@ -69,6 +106,8 @@ class HelpText:
 
 
 class CourseWithMetadata:
+    __slots__ = ('course', 'grade', 'help_text')
+
     def __init__(self, course: CourseCode, grade: Optional[GradeRequirement] = None,
                  help_text: Optional[HelpText] = None):
         self.course = course
@@ -79,31 +118,36 @@ class CourseWithMetadata:
         return f"CourseWithMetadata({self.course}, {self.grade}, {self.help_text})"
 
 
-class CommaExpression:
+class LogicalExpression:
+    """Operands joined by one operator; subclasses only name the operator"""
+    __slots__ = ('operands',)
+    KIND = ''  # Step name recorded in logical paths
+
     def __init__(self, operands: List[Any]):
         self.operands = operands
 
     def __repr__(self):
-        return f"CommaExpression({self.operands})"
+        return f"{type(self).__name__}({self.operands})"
 
 
-class AndExpression:
-    def __init__(self, operands: List[Any]):
-        self.operands = operands
+class CommaExpression(LogicalExpression):
+    __slots__ = ()
+    KIND = 'comma'
 
-    def __repr__(self):
-        return f"AndExpression({self.operands})"
 
+class AndExpression(LogicalExpression):
+    __slots__ = ()
+    KIND = 'and'
 
-class OrExpression:
-    def __init__(self, operands: List[AndExpression]):
-        self.operands = operands
 
-    def __repr__(self):
-        return f"OrExpression({self.operands})"
+class OrExpression(LogicalExpression):
+    __slots__ = ()
+    KIND = 'or'
 
 
 class GroupedExpression:
+    __slots__ = ('expression',)
+
     def __init__(self, expression: OrExpression):
         self.expression = expression
 
@@ -114,17 +158,18 @@ class GroupedExpression:
 
 
 class PrerequisiteTransformer(Transformer):
-    def course_code(self, args):
-        subject, number = args
-        return CourseCode(str(subject), str(number))
+    @v_args(inline=True)
+    def course_code(self, subject, number):
+        return CourseCode.get(str(subject), str(number))
 
-    def grade_requirement(self, args):
-        # args = [MIN_GRADE_TEXT, GRADE_VALUE] - brackets are handled by grammar
-        return GradeRequirement(str(args[1]))  # Grade value is at index 1
+    @v_args(inline=True)
+    def grade_requirement(self, min_grade_text, grade_value):
+        # Brackets are handled by grammar
+        return GradeRequirement.get(str(grade_value))
 
-    def help_text(self, args):
-        # args = ["(", help_content, ")"]
-        return HelpText(str(args[1]))
+    @v_args(inline=True)
+    def help_text(self, open_paren, content, close_paren):
+        return HelpText(str(content))
 
     def course_with_metadata(self, args):
         course = args[0]
@@ -162,26 +207,247 @@ class PrerequisiteTransformer(Transformer):
     def start(self, args):
         return args[0]  # Return the top-level expression
 
+
+# Hand-written recursive-descent parser
+#
+# Recognizes PREREQUISITE_GRAMMAR without Lark's Token/Tree allocations and
+# builds the same AST PrerequisiteTransformer produces (left-nested binary
+# or/and/comma expressions). Each method only lexes the terminals valid at
+# that point, mirroring Lark's contextual lexer.
+
+_WS_RE = re.compile(r'[ \t\f\r\n]+')
+_SUBJECT_ID_RE = re.compile(r'[A-Z0-9]{2,5}')
+_COURSE_NUMBER_RE = re.compile(r'[A-Z0-9]+')
+_GRADE_VALUE_RE = re.compile(r'CR|NC|[A-F][+-]?')
+_MIN_GRADE_TEXT_RE = re.compile(r'[Mm]in\s+[Gg]rade\s*:\s*')
+_HELP_TEXT_CONTENT_RE = re.compile(r'[^)]+')
+_OR_RE = re.compile(r'or', re.IGNORECASE)
+_AND_RE = re.compile(r'and', re.IGNORECASE)
+
+# Used by PrerequisiteParser.preprocess_text
+# Malformed course codes like "APPH50 P" or "MATH100 A":
+# letters+numbers followed by space and single letter/number
+_COURSE_CODE_RE = re.compile(r'\b([A-Z]+)(\d+)\s+([A-Z0-9])\b')
+_PAREN_RE = re.compile(r'[()]')
+# Any whitespace other than a plain space
+_OTHER_WS_RE = re.compile(r'[^\S ]')
+
+
+class DescentParser:
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def parse(self):
+        """Parse the whole text and return the AST"""
+        node = self.parse_or()
+        self._skip_ws()
+        if self.pos != len(self.text):
+            self._error("end of input")
+        return node
+
+    def _skip_ws(self):
+        match = _WS_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+
+    def _accept(self, pattern) -> Optional[str]:
+        """Match a terminal at the current position and consume it"""
+        self._skip_ws()
+        match = pattern.match(self.text, self.pos)
+        if match is None:
+            return None
+        self.pos = match.end()
+        return match.group()
+
+    def _accept_char(self, char: str) -> bool:
+        self._skip_ws()
+        if self.text.startswith(char, self.pos):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, pattern, name: str) -> str:
+        value = self._accept(pattern)
+        if value is None:
+            self._error(name)
+        return value
+
+    def _expect_char(self, char: str):
+        if not self._accept_char(char):
+            self._error(repr(char))
+
+    def _error(self, expected: str):
+        found = self.text[self.pos:self.pos + 20] or "end of input"
+        raise ValueError(
+            f"Expected {expected} at column {self.pos + 1}, found {found!r}")
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self._accept(_OR_RE):
+            node = OrExpression([node, self.parse_and()])
+        return node
+
+    def parse_and(self):
+        node = self.parse_comma()
+        while self._accept(_AND_RE):
+            node = AndExpression([node, self.parse_comma()])
+        return node
+
+    def parse_comma(self):
+        node = self.parse_term()
+        while self._accept_char(','):
+            node = CommaExpression([node, self.parse_term()])
+        return node
+
+    def parse_term(self):
+        if self._accept_char('('):
+            expression = self.parse_or()
+            self._expect_char(')')
+            return GroupedExpression(expression)
+
+        subject = self._expect(_SUBJECT_ID_RE, "SUBJECT_ID")
+        number = self._expect(_COURSE_NUMBER_RE, "COURSE_NUMBER")
+        course = CourseCode.get(subject, number)
+
+        grade = None
+        if self._accept_char('['):
+            self._expect(_MIN_GRADE_TEXT_RE, "MIN_GRADE_TEXT")
+            grade = GradeRequirement.get(
+                self._expect(_GRADE_VALUE_RE, "GRADE_VALUE"))
+            self._expect_char(']')
+
+        help_text = None
+        if self._accept_char('('):
+            help_text = HelpText(
+                self._expect(_HELP_TEXT_CONTENT_RE, "HELP_TEXT_CONTENT"))
+            self._expect_char(')')
+
+        return CourseWithMetadata(course, grade, help_text)
+
+# Shared parser instances: building the LALR tables is expensive, so do it
+# at most once per process, and only when the 'lark' engine is actually used
+# (cache=True also persists the tables to disk across runs). The transformer
+# runs on each LALR reduction, so parse() returns the AST without building
+# an intermediate Tree.
+
+_TRANSFORMER = PrerequisiteTransformer()
+
+
+@lru_cache(maxsize=1)
+def _get_lark() -> Lark:
+    # The contextual lexer only tries terminals the parser can accept next,
+    # so HELP_TEXT_CONTENT is never attempted outside a help_text
+    return Lark(PREREQUISITE_GRAMMAR, parser='lalr', lexer='contextual',
+                cache=True, transformer=_TRANSFORMER)
+
+
+# The most common prerequisite: one course with an optional minimum grade,
+# single-spaced as preprocess_text leaves it. Anything else falls through to
+# the full parser, which builds the same AST for the texts this matches.
+_SINGLE_COURSE_RE = re.compile(
+    r'([A-Z0-9]{2,5}) ([A-Z0-9]+)'
+    r'(?: ?\[ ?[Mm]in\s+[Gg]rade\s*:\s*(CR|NC|[A-F][+-]?) ?\])?')
+
+
+@lru_cache(maxsize=4096)
+def _parse_cleaned(engine: str, cleaned_text: str):
+    """Parse already-cleaned text; ASTs are read-only, so hits share one tree"""
+    if engine == 'lark':
+        return _get_lark().parse(cleaned_text)
+
+    match = _SINGLE_COURSE_RE.fullmatch(cleaned_text)
+    if match:
+        subject, number, grade = match.groups()
+        return CourseWithMetadata(CourseCode.get(subject, number),
+                                  GradeRequirement.get(grade) if grade else None)
+    return DescentParser(cleaned_text).parse()
+
+
+class ExtractedCourse(NamedTuple):
+    """One course found in a prerequisite AST, with its logical context"""
+    subject: str
+    number: str
+    min_grade: str
+    help_text: Optional[str]
+    logical_path: Tuple
+    group_level: int
+
+
+# Course extraction handlers, called as handler(node, logical_path,
+# group_level, stack). Expression handlers push their children onto the
+# stack; the course handler returns the extracted course.
+
+
+def _extract_course(node: CourseWithMetadata, logical_path: Tuple,
+                    group_level: int, stack: List) -> ExtractedCourse:
+    return ExtractedCourse(
+        node.course.subject,
+        node.course.number,
+        node.grade.grade if node.grade else 'D',
+        node.help_text.content if node.help_text else None,
+        logical_path,
+        group_level
+    )
+
+
+def _extract_operands(node: LogicalExpression, logical_path: Tuple,
+                      group_level: int, stack: List):
+    # Pushed last operand first so they are popped in order
+    kind = node.KIND
+    operands = node.operands
+    parent_id = id(logical_path)
+    for i in range(len(operands) - 1, -1, -1):
+        key = (parent_id, kind, i)
+        path = _PATH_CACHE.get(key)
+        if path is None:
+            path = _PATH_CACHE[key] = logical_path + ((kind, i),)
+        stack.append((operands[i], path, group_level))
+
+
+def _extract_grouped(node: GroupedExpression, logical_path: Tuple,
+                     group_level: int, stack: List):
+    stack.append((node.expression, logical_path, group_level + 1))
+
+
+# Keyed by concrete class: LogicalExpression itself never appears in an AST
+_EXTRACT_DISPATCH = {
+    CourseWithMetadata: _extract_course,
+    CommaExpression: _extract_operands,
+    AndExpression: _extract_operands,
+    OrExpression: _extract_operands,
+    GroupedExpression: _extract_grouped,
+}
+
 # Main Parser Class
 
 
 class PrerequisiteParser:
-    def __init__(self):
-        # ADD THIS DEBUG PRINT STATEMENT
-        print("\n--- Current PREREQUISITE_GRAMMAR being used: ---")
-        print(PREREQUISITE_GRAMMAR)
-        print("--------------------------------------------------\n")
-        self.parser = Lark(PREREQUISITE_GRAMMAR, parser='lalr')
-        self.transformer = PrerequisiteTransformer()
+    def __init__(self, engine: str = 'descent'):
+        """engine: 'descent' (hand-written parser) or 'lark' (reference LALR)"""
+        if engine not in ('descent', 'lark'):
+            raise ValueError(f"Unknown parser engine: {engine}")
+        self.engine = engine
+        self.transformer = _TRANSFORMER
+        # Number of malformed course codes rewritten by _fix_course_codes
+        self.course_code_fixes = 0
+
+    @property
+    def parser(self) -> Lark:
+        """The shared Lark parser, built on first use"""
+        return _get_lark()
 
     def preprocess_text(self, text: str) -> str:
         """Preprocess text to handle common data quality issues"""
-        # Clean whitespace
-        text = text.replace('\n', ' ').replace('\r', ' ')
-        text = ' '.join(text.split())
+        # Clean whitespace (skipped when it is already single-spaced); the
+        # edge checks stand in for text.strip() without building a copy
+        if ('  ' in text or text[:1] == ' ' or text[-1:] == ' '
+                or _OTHER_WS_RE.search(text)):
+            text = ' '.join(text.split())
 
         # Fix malformed course codes
-        text = self._fix_course_codes(text)
+        if _COURSE_CODE_RE.search(text):
+            text = self._fix_course_codes(text)
 
         # Fix unbalanced parentheses
         text = self._fix_unbalanced_parentheses(text)
@@ -190,64 +456,61 @@ class PrerequisiteParser:
 
     def _fix_course_codes(self, text: str) -> str:
         """Fix common course code formatting issues"""
-        import re
-
-        # Pattern to match malformed course codes like "APPH50 P" or "MATH100 A"
-        # This matches: letters+numbers followed by space and single letter/number
-        pattern = r'\b([A-Z]+)(\d+)\s+([A-Z0-9])\b'
 
         def replace_course_code(match):
             subject_part = match.group(1)  # "APPH"
             number_part = match.group(2)   # "50"
             suffix_part = match.group(3)   # "P"
 
+            # Counted rather than printed so the parse loop does no I/O
+            self.course_code_fixes += 1
+
             # Try to determine if this should be "SUBJ NUMP" or "SUBJNUM P"
             if len(subject_part) <= 4:  # Likely a normal subject code
-                fixed = f"{subject_part} {number_part}{suffix_part}"
-                print(f"   WARNING: Fixed course code '{
-                      match.group(0)}' → '{fixed}'")
-                return fixed
+                return f"{subject_part} {number_part}{suffix_part}"
             else:  # Subject might include numbers
-                fixed = f"{
-                    subject_part[:-len(number_part)]} {number_part}{suffix_part}"
-                print(f"   WARNING: Fixed course code '{
-                      match.group(0)}' → '{fixed}'")
-                return fixed
+                return f"{subject_part[:-len(number_part)]} {number_part}{suffix_part}"
 
-        original_text = text
-        text = re.sub(pattern, replace_course_code, text)
-
-        return text
+        return _COURSE_CODE_RE.sub(replace_course_code, text)
 
     def _fix_unbalanced_parentheses(self, text: str) -> str:
         """Fix unbalanced parentheses by removing extras"""
-        open_count = 0
-        fixed_chars = []
+        if '(' not in text and ')' not in text:
+            return text
 
-        # First pass: track opens and mark excess closes
-        for char in text:
-            if char == '(':
+        # One pass over the parentheses only: track depth and remember the
+        # position of every closing parenthesis that has no match
+        open_count = 0
+        excess = []
+        for match in _PAREN_RE.finditer(text):
+            if match.group() == '(':
                 open_count += 1
-                fixed_chars.append(char)
-            elif char == ')':
-                if open_count > 0:
-                    open_count -= 1
-                    fixed_chars.append(char)
-                else:
-                    # Skip excess closing parenthesis
-                    print(f"   WARNING: Removed excess closing parenthesis")
-                    continue
+            elif open_count > 0:
+                open_count -= 1
             else:
-                fixed_chars.append(char)
+                excess.append(match.start())
+
+        # Balanced text (the common case) is returned unchanged
+        if not excess and open_count == 0:
+            return text
+
+        pieces = []
+        start = 0
+        for position in excess:
+            # Skip excess closing parenthesis
+            print(f"   WARNING: Removed excess closing parenthesis")
+            pieces.append(text[start:position])
+            start = position + 1
+        pieces.append(text[start:])
 
         # Remove any unclosed opening parentheses from the end
         if open_count > 0:
             print(f"   WARNING: Found {
                   open_count} unclosed opening parentheses")
             # For now, just add closing parens at the end
-            fixed_chars.extend([')'] * open_count)
+            pieces.append(')' * open_count)
 
-        return ''.join(fixed_chars)
+        return ''.join(pieces)
 
     def parse(self, text: str):
         """Parse prerequisite text and return AST"""
@@ -255,52 +518,66 @@ class PrerequisiteParser:
             # Preprocess text to handle common issues
             cleaned_text = self.preprocess_text(text)
             if cleaned_text != text:
-                print(f"   TEXT CLEANED: {text}")
-                print(f"   TO: {cleaned_text}")
+                # One write, so lines from parallel workers stay paired
+                print(f"   TEXT CLEANED: {text}\n   TO: {cleaned_text}")
 
-            parse_tree = self.parser.parse(cleaned_text)
-            return self.transformer.transform(parse_tree)
+            return _parse_cleaned(self.engine, cleaned_text)
         except Exception as e:
             raise ValueError(f"Parse error: {e}")
 
-    def extract_courses(self, ast) -> List[Dict[str, Any]]:
+    def extract_courses(self, ast) -> List[ExtractedCourse]:
         """Extract all courses from AST with metadata"""
-        courses = []
-        self._extract_courses_recursive(ast, courses, [], 0)
-        return courses
-
-    def _extract_courses_recursive(self, node, courses: List, logical_path: List, group_level: int):
-        """Recursively extract courses with their logical context"""
-
-        if isinstance(node, CourseWithMetadata):
-            course_info = {
-                'subject': node.course.subject,
-                'number': node.course.number,
-                'min_grade': node.grade.grade if node.grade else 'D',
-                'help_text': node.help_text.content if node.help_text else None,
-                'logical_path': logical_path.copy(),
-                'group_level': group_level
-            }
-            courses.append(course_info)
-
-        elif isinstance(node, CommaExpression):
-            for i, operand in enumerate(node.operands):
-                new_path = logical_path + [('comma', i)]
-                self._extract_courses_recursive(
-                    operand, courses, new_path, group_level)
-
-        elif isinstance(node, AndExpression):
-            for i, operand in enumerate(node.operands):
-                new_path = logical_path + [('and', i)]
-                self._extract_courses_recursive(
-                    operand, courses, new_path, group_level)
-
-        elif isinstance(node, OrExpression):
-            for i, operand in enumerate(node.operands):
-                new_path = logical_path + [('or', i)]
-                self._extract_courses_recursive(
-                    operand, courses, new_path, group_level)
-
-        elif isinstance(node, GroupedExpression):
-            self._extract_courses_recursive(
-                node.expression, courses, logical_path, group_level + 1)
+        return list(self.iter_courses(ast))
+
+    def iter_courses(self, ast) -> Iterator[ExtractedCourse]:
+        """Yield the courses in the AST one at a time, in extract_courses order
+
+        The walk uses an explicit stack of (node, logical_path, group_level)
+        entries instead of recursion. Logical paths come from _PATH_CACHE, so
+        each distinct path is built once rather than copied per child.
+        """
+        stack = [(ast, (), 0)]
+        # Bound once so the loop does local lookups only
+        pop = stack.pop
+        get_handler = _EXTRACT_DISPATCH.get
+        while stack:
+            node, logical_path, group_level = pop()
+            # Concrete AST node classes are never subclassed, so dispatch on the exact type
+            handler = get_handler(type(node))
+            if handler is not None:
+                course = handler(node, logical_path, group_level, stack)
+                if course is not None:
+                    yield course
+
+
+# Parsing across worker processes, shared by graph.py and test.py
+
+# Below this many distinct prerequisite texts, process startup costs more
+# than parsing serially
+PARALLEL_PARSE_THRESHOLD = 500
+
+# Parse function of the current worker process, built by _init_parse_worker
+_worker_parse: Optional[Callable[[str], Any]] = None
+
+
+def _init_parse_worker(make_parse: Callable[[], Callable[[str], Any]]):
+    """Build the parse function once per worker process"""
+    global _worker_parse
+    _worker_parse = make_parse()
+
+
+def parse_in_worker(text: str) -> Any:
+    """Parse one text with the worker's parse function; map this over the pool"""
+    return _worker_parse(text)
+
+
+def parse_worker_pool(make_parse: Callable[[], Callable[[str], Any]],
+                      max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool whose workers each build their parse function with make_parse()
+
+    make_parse must be picklable (a module-level function or a partial of one).
+    Worker processes start on the first submitted task, so an unused pool is cheap.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers,
+                               initializer=_init_parse_worker,
+                               initargs=(make_parse,))
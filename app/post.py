@@ -2,30 +2,53 @@
 Post-processing script to replace course IDs in adjacency list with actual UUIDs from CSV
 """
 
+import copy
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 import pandas as pd
-import json
-from typing import Dict, List, Optional, Any
+import orjson
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 import sys
 
+# Joins subject and number into one lookup key; never occurs in course names.
+# (Not NUL: pandas' string hashing stops at the first NUL byte.)
+_KEY_SEP = '\x1f'
+
 
 class CourseIDReplacer:
     """Replaces course IDs in adjacency list with actual UUIDs from CSV"""
 
-    def __init__(self, csv_filename: str = 'courses.csv'):
+    def __init__(self, csv_filename: str = 'courses.csv', verbose: bool = False,
+                 defer_mapping: bool = False):
+        """defer_mapping: leave the CSV for process_file to read alongside the JSON"""
         self.csv_filename = csv_filename
-        self.course_lookup = {}
-        self.load_course_mapping()
-
-    def load_course_mapping(self):
-        """Load courses from CSV and create lookup mapping"""
+        # Per-course progress output; off by default since it dominates runtime
+        self.verbose = verbose
+        # "SUBJ<sep>NUM" -> uuid, shared by the single and batched lookups
+        self.course_lookup: Dict[str, str] = {}
+        if not defer_mapping:
+            self.load_course_mapping()
+
+    def read_courses_csv(self) -> pd.DataFrame:
+        """Read the lookup columns of the courses CSV"""
+        # Only the lookup columns are needed, all read as strings
+        return pd.read_csv(self.csv_filename,
+                           usecols=['subject_id', 'course_number', 'id'],
+                           dtype=str)
+
+    def load_course_mapping(self, pending_csv: Optional[Future] = None):
+        """Load courses from CSV and create lookup mapping
+
+        pending_csv: a future for read_courses_csv() already running elsewhere
+        """
         try:
-            df = pd.read_csv(self.csv_filename)
+            df = pending_csv.result() if pending_csv is not None else self.read_courses_csv()
             print(f"✅ Loaded {len(df)} courses from {self.csv_filename}")
 
-            # Create lookup dictionary: (subject_id, course_number) -> uuid
-            for _, row in df.iterrows():
-                key = (row['subject_id'].strip(), row['course_number'].strip())
-                self.course_lookup[key] = row['id']
+            # Create lookup dictionary: "SUBJ<sep>NUM" -> uuid
+            keys = (df['subject_id'].str.strip() + _KEY_SEP
+                    + df['course_number'].str.strip())
+            self.course_lookup.update(zip(keys.to_numpy(), df['id'].to_numpy()))
 
             print(f"📚 Created lookup mapping for {
                   len(self.course_lookup)} courses")
@@ -39,9 +62,19 @@ class CourseIDReplacer:
 
     def find_course_uuid(self, course_name: str) -> Optional[str]:
         """Find UUID for a course given its name (e.g., 'EDUC 120')"""
-        try:
+        if not isinstance(course_name, str):
+            print(f"⚠️ Error processing course name '{
+                  course_name}': expected a string")
+            return None
+
+        # Common case: "SUBJ NUM" separated by single spaces
+        name = course_name.strip()
+        subject_id, _, rest = name.partition(' ')
+        course_number = rest.partition(' ')[0]
+
+        if not (course_number and subject_id.isalnum() and course_number.isalnum()):
             # Split course name by whitespace
-            parts = course_name.strip().split()
+            parts = name.split()
             if len(parts) < 2:
                 print(f"⚠️ Warning: Invalid course name format: '{
                       course_name}'")
@@ -50,21 +83,17 @@ class CourseIDReplacer:
             subject_id = parts[0]
             course_number = parts[1]
 
-            # Look up in mapping
-            key = (subject_id, course_number)
-            if key in self.course_lookup:
-                return self.course_lookup[key]
-            else:
-                print(f"⚠️ Warning: Course not found in CSV: {
-                      subject_id} {course_number}")
-                return None
+        # Look up in mapping
+        uuid = self.course_lookup.get(f"{subject_id}{_KEY_SEP}{course_number}")
+        if uuid is not None:
+            return uuid
 
-        except Exception as e:
-            print(f"⚠️ Error processing course name '{course_name}': {e}")
-            return None
+        print(f"⚠️ Warning: Course not found in CSV: {
+              subject_id} {course_number}")
+        return None
 
     def process_course_object(self, course: Dict[str, Any]) -> Dict[str, Any]:
-        """Process a single course object and replace its ID"""
+        """Replace a single course object's ID in place and return it"""
         if 'coursename' not in course:
             print("⚠️ Warning: Course object missing 'coursename' field")
             return course
@@ -72,70 +101,92 @@ class CourseIDReplacer:
         course_name = course['coursename']
         uuid = self.find_course_uuid(course_name)
 
+        # Keep original if UUID not found
         if uuid:
-            # Create updated course object
-            updated_course = course.copy()
-            updated_course['id'] = uuid
-            return updated_course
-        else:
-            # Keep original if UUID not found
-            return course
-
-    def process_and_group(self, and_group: Dict[str, Any]) -> Dict[str, Any]:
-        """Process an AND group and replace course IDs"""
-        if 'courses' not in and_group:
-            print("⚠️ Warning: AND group missing 'courses' field")
-            return and_group
-
-        updated_and_group = and_group.copy()
-        updated_courses = []
-
-        for course in and_group['courses']:
-            updated_course = self.process_course_object(course)
-            updated_courses.append(updated_course)
-
-        updated_and_group['courses'] = updated_courses
-        return updated_and_group
+            course['id'] = uuid
+        return course
+
+    def lookup_course_uuids(self, course_names: List[Any]) -> List[Optional[str]]:
+        """Resolve many course names at once through course_lookup
+
+        Returns one UUID (or None when not found or not a string) per name,
+        in order.
+
+        >>> CourseIDReplacer(defer_mapping=True).lookup_course_uuids([5, None])
+        [None, None]
+        """
+        if not course_names:
+            return []
+
+        # Same tokenization as find_course_uuid: first two whitespace-separated
+        # parts. Non-strings become NaN first, since .str rejects a Series
+        # without any strings in it.
+        names = pd.Series(course_names, dtype=object)
+        names = names.where(names.map(type) == str).astype(object)
+        parts = names.str.strip().str.split(n=2, expand=True)
+        parts = parts.reindex(columns=[0, 1]).astype(object)
+
+        # Missing parts leave the key NaN, which is never in the lookup
+        uuids = parts[0].str.cat(parts[1], sep=_KEY_SEP).map(self.course_lookup)
+        uuids = uuids.astype(object)
+        return uuids.where(uuids.notna(), None).tolist()
 
     def process_adjacency_list(self, adjacency_data: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
-        """Process the entire adjacency list and replace course IDs"""
-        updated_adjacency = {}
+        """Replace course IDs across the adjacency list in place and return it"""
         processed_courses = 0
         updated_ids = 0
 
+        # Resolve every course name in one vectorized lookup against
+        # course_lookup (lookup_course_uuids), then hand the UUIDs back out in order
+        course_names = [course.get('coursename')
+                        for and_groups in adjacency_data.values()
+                        for and_group in and_groups
+                        for course in and_group.get('courses', [])]
+        uuids = iter(self.lookup_course_uuids(course_names))
+
         for course_id, and_groups in adjacency_data.items():
-            print(f"\n🔄 Processing course: {course_id}")
+            if self.verbose:
+                print(f"\n🔄 Processing course: {course_id}")
 
-            updated_and_groups = []
             for and_group in and_groups:
-                updated_and_group = self.process_and_group(and_group)
-                updated_and_groups.append(updated_and_group)
-
-                # Count updated IDs
-                for course in updated_and_group.get('courses', []):
-                    if course.get('id') != course.get('coursename'):
+                if 'courses' not in and_group:
+                    print("⚠️ Warning: AND group missing 'courses' field")
+                    continue
+
+                for course in and_group['courses']:
+                    uuid = next(uuids)
+                    if 'coursename' not in course:
+                        print("⚠️ Warning: Course object missing 'coursename' field")
+                        continue
+
+                    # Unresolved names go through find_course_uuid for its warnings
+                    if uuid is None:
+                        uuid = self.find_course_uuid(course['coursename'])
+
+                    # Keep original if UUID not found
+                    if uuid:
+                        course['id'] = uuid
                         updated_ids += 1
 
-            updated_adjacency[course_id] = updated_and_groups
             processed_courses += 1
 
         print(f"\n📊 Processing Summary:")
         print(f"   • Processed {processed_courses} courses")
         print(f"   • Updated {updated_ids} course IDs")
 
-        return updated_adjacency
+        return adjacency_data
 
     def load_adjacency_json(self, filename: str) -> Dict[str, List[Dict]]:
         """Load adjacency list from JSON file"""
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(filename, 'rb') as f:
+                data = orjson.loads(f.read())
             print(f"✅ Loaded adjacency list from {filename}")
             return data
         except FileNotFoundError:
             print(f"❌ Error: {filename} not found")
             sys.exit(1)
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"❌ Error: Invalid JSON in {filename}: {e}")
             sys.exit(1)
         except Exception as e:
@@ -145,25 +196,19 @@ class CourseIDReplacer:
     def save_adjacency_json(self, data: Dict[str, List[Dict]], filename: str):
         """Save updated adjacency list to JSON file"""
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(
+                    data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
             print(f"💾 Updated adjacency list saved to {filename}")
         except Exception as e:
             print(f"❌ Error saving JSON: {e}")
             sys.exit(1)
 
-    def print_sample_changes(self, original_data: Dict, updated_data: Dict, max_samples: int = 3):
-        """Print sample of changes made"""
-        print(f"\n{'='*60}")
-        print("📋 SAMPLE CHANGES")
-        print(f"{'='*60}")
-
-        count = 0
-        for course_id in original_data:
-            if count >= max_samples:
-                break
-
-            orig_groups = original_data[course_id]
+    @staticmethod
+    def _iter_id_changes(original_data: Dict, updated_data: Dict) -> Iterator[Tuple]:
+        """Yield (course_id, group_index, course_index, original, updated) for the
+        first changed course ID in each group"""
+        for course_id, orig_groups in original_data.items():
             updated_groups = updated_data[course_id]
 
             for i, (orig_group, updated_group) in enumerate(zip(orig_groups, updated_groups)):
@@ -172,18 +217,25 @@ class CourseIDReplacer:
 
                 for j, (orig_course, updated_course) in enumerate(zip(orig_courses, updated_courses)):
                     if orig_course.get('id') != updated_course.get('id'):
-                        print(f"\nCourse: {
-                              course_id} -> Group {i+1} -> Course {j+1}")
-                        print(f"  Course Name: {
-                              orig_course.get('coursename')}")
-                        print(f"  Original ID: {orig_course.get('id')}")
-                        print(f"  Updated ID:  {updated_course.get('id')}")
-                        count += 1
+                        yield course_id, i, j, orig_course, updated_course
                         break
-                if count >= max_samples:
-                    break
-            if count >= max_samples:
-                break
+
+    def print_sample_changes(self, original_data: Dict, updated_data: Dict, max_samples: int = 3):
+        """Print sample of changes made"""
+        print(f"\n{'='*60}")
+        print("📋 SAMPLE CHANGES")
+        print(f"{'='*60}")
+
+        count = 0
+        for course_id, i, j, orig_course, updated_course in islice(
+                self._iter_id_changes(original_data, updated_data), max_samples):
+            print(f"\nCourse: {
+                  course_id} -> Group {i+1} -> Course {j+1}")
+            print(f"  Course Name: {
+                  orig_course.get('coursename')}")
+            print(f"  Original ID: {orig_course.get('id')}")
+            print(f"  Updated ID:  {updated_course.get('id')}")
+            count += 1
 
         if count == 0:
             print("No changes were made to course IDs")
@@ -198,11 +250,20 @@ class CourseIDReplacer:
         print(f"📁 Output file: {output_filename}")
         print(f"📁 CSV file: {self.csv_filename}")
 
-        # Load original data
-        original_data = self.load_adjacency_json(input_filename)
+        # Load original data; a deferred CSV mapping is read on a second
+        # thread meanwhile
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pending_csv = None
+            if not self.course_lookup:
+                pending_csv = executor.submit(self.read_courses_csv)
+            original_data = self.load_adjacency_json(input_filename)
+
+        if pending_csv is not None:
+            self.load_course_mapping(pending_csv)
 
-        # Process and update IDs
-        updated_data = self.process_adjacency_list(original_data)
+        # Process and update IDs; the update is in place, so keep one copy
+        # of the originals for the sample diff
+        updated_data = self.process_adjacency_list(copy.deepcopy(original_data))
 
         # Show sample changes
         self.print_sample_changes(original_data, updated_data)
@@ -225,11 +286,14 @@ def main():
         '-o', '--output', help='Output JSON file (default: input_updated.json)')
     parser.add_argument('-c', '--csv', default='courses.csv',
                         help='CSV file with course data (default: courses.csv)')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Print a line for every processed course')
 
     args = parser.parse_args()
 
     # Create replacer and process file
-    replacer = CourseIDReplacer(csv_filename=args.csv)
+    replacer = CourseIDReplacer(csv_filename=args.csv, verbose=args.verbose,
+                                defer_mapping=True)
     replacer.process_file(args.input_json, args.output)
 
 
@@ -240,6 +304,6 @@ if __name__ == "__main__":
     else:
         # Demo usage
         print("Demo: Processing course_adjacency_graph.json with courses.csv")
-        replacer = CourseIDReplacer('courses.csv')
+        replacer = CourseIDReplacer('courses.csv', defer_mapping=True)
         replacer.process_file('course_adjacency_graph.json',
                               'course_adjacency_graph_updated.json')
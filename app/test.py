@@ -3,17 +3,104 @@ Course Prerequisite Parser using Lark
 Install: pip install lark pandas
 """
 
+import csv
+import os
+import re
+import sys
+from contextlib import nullcontext
+from functools import lru_cache, partial
 import pandas as pd
-from parser import PrerequisiteParser
+from parser import (PARALLEL_PARSE_THRESHOLD, PrerequisiteParser,
+                    parse_in_worker, parse_worker_pool)
+
+# Corequisite entries like "MATH 101" at the start of each comma-separated item
+_COREQ_RE = re.compile(r'(?:^|,)\s*([A-Z]{2,5})\s+([A-Z0-9]+)')
+# Malformed course codes like "APPH50 P"
+_SUSP_RE = re.compile(r'\b[A-Z]+\d+\s+[A-Z0-9]\b')
+# DescentParser errors: "Expected <terminal> at column N, found '<text>'"
+_DESCENT_ERROR_RE = re.compile(r"Expected (.+?) at column \d+, found '(.*)", re.S)
+
+# Without --verbose, report progress every PROGRESS_EVERY rows instead of
+# printing every course
+PROGRESS_EVERY = 500
+
+# Each worker process gets about this many batches of prerequisite texts,
+# trading IPC round-trips against keeping every worker busy
+PARSE_CHUNKS_PER_WORKER = 4
+
+# Rows read from courses.csv per chunk
+CSV_CHUNK_SIZE = 10_000
+
+# Columns written to the --output CSV, one row per parsed prerequisite course:
+# the parent course, then the ExtractedCourse fields
+OUTPUT_COLUMNS = ['course_subject', 'course_number', 'prereq_subject',
+                  'prereq_number', 'min_grade', 'help_text', 'logical_path',
+                  'group_level']
+
+# Columns read from courses.csv
+CSV_COLUMNS = ['subject_id', 'course_number', 'title',
+               'prerequisites', 'corequisites']
+
+
+def _discard(line):
+    pass
+
+
+def _failure_hint(error_msg):
+    """Guess the likely cause of a parse error from either engine's message"""
+    # Lark names the offending token
+    if "Unexpected token" in error_msg:
+        if "CLOSE_PAREN" in error_msg:
+            return "Likely unbalanced parentheses issue"
+        if "COURSE_NUMBER" in error_msg:
+            return "Likely malformed course code (check spacing)"
+        return "Check for invalid characters or formatting"
+
+    # DescentParser names the expected terminal and the text it found
+    match = _DESCENT_ERROR_RE.search(error_msg)
+    if match:
+        expected, found = match.groups()
+        if expected == "')'" or found.startswith(')'):
+            return "Likely unbalanced parentheses issue"
+        if expected == "COURSE_NUMBER" or (
+                expected == "end of input" and found[:1].isalnum()):
+            return "Likely malformed course code (check spacing)"
+        return "Check for invalid characters or formatting"
+    return None
+
+
+def _make_parse(engine='descent'):
+    """Build a parse function with its own parser, once per process
+
+    The function returns (True, courses, fixes) or (False, error message,
+    fixes), where fixes counts the course codes the parser repaired.
+    """
+    parser = PrerequisiteParser(engine)
+
+    @lru_cache(maxsize=None)
+    def parse_normalized(prereq_text):
+        fixes_before = parser.course_code_fixes
+        try:
+            ast = parser.parse(prereq_text)
+            result = True, parser.extract_courses(ast)
+        except ValueError as e:
+            # PrerequisiteParser.parse reports every parse failure as ValueError
+            result = False, str(e)
+        return (*result, parser.course_code_fixes - fixes_before)
+
+    def parse(prereq_text):
+        # The parser collapses whitespace anyway, so variants share a cache entry
+        return parse_normalized(' '.join(prereq_text.split()))
 
+    return parse
 
-def load_courses_csv(filename='courses.csv'):
-    """Load courses from CSV file"""
+
+def load_courses_csv(filename='courses.csv', chunksize=CSV_CHUNK_SIZE):
+    """Open courses CSV file as a reader yielding DataFrame chunks"""
     try:
-        df = pd.read_csv(filename)
-        print(f"Loaded {len(df)} courses from {filename}")
-        print(f"Columns: {list(df.columns)}")
-        return df
+        # Only the columns parse_all_prerequisites reads, as strings
+        return pd.read_csv(filename, usecols=CSV_COLUMNS, dtype=str,
+                           chunksize=chunksize)
     except FileNotFoundError:
         print(f"Error: {filename} not found in current directory")
         return None
@@ -22,121 +109,193 @@ def load_courses_csv(filename='courses.csv'):
         return None
 
 
-def parse_all_prerequisites():
-    """Parse all prerequisites and corequisites from courses.csv"""
+def parse_all_prerequisites(filename='courses.csv', max_workers=None, verbose=False,
+                            output=None, engine='descent'):
+    """Parse all prerequisites and corequisites from courses.csv
 
-    # Load the CSV
-    df = load_courses_csv()
-    if df is None:
-        return
+    max_workers sets the number of parser processes (default: one per CPU).
+    verbose prints every course; otherwise only failures and progress are shown.
+    output, if given, is a CSV file that receives every parsed prerequisite.
+    engine selects the PrerequisiteParser engine ('descent' or 'lark').
+    """
 
-    # Initialize parser
-    parser = PrerequisiteParser()
+    # Stream the CSV so memory is bounded by the chunk size
+    reader = load_courses_csv(filename)
+    if reader is None:
+        return
 
     # Statistics
-    total_courses = len(df)
+    total_courses = 0
     prerequisite_count = 0
     corequisite_count = 0
     successful_parses = 0
     failed_parses = 0
+    course_code_fixes = 0
 
     print(f"\n{'='*80}")
     print("PARSING ALL COURSE PREREQUISITES AND COREQUISITES")
     print(f"{'='*80}")
 
-    # Process each course
-    for idx, row in df.iterrows():
-        course_code = f"{row['subject_id']} {row['course_number']}"
-        course_title = str(row['title'])[
-            :50] + "..." if len(str(row['title'])) > 50 else str(row['title'])
-
-        print(f"\n[{idx+1:4d}/{total_courses}] {course_code}: {course_title}")
-        print("-" * 80)
-
-        # Parse Prerequisites
-        if pd.notna(row['prerequisites']) and str(row['prerequisites']).strip():
-            prerequisite_count += 1
-            prereq_text = str(row['prerequisites']).strip()
-
-            print(f"PREREQUISITES: {prereq_text}")
-
-            try:
-                ast = parser.parse(prereq_text)
-                courses = parser.extract_courses(ast)
-                successful_parses += 1
-
-                print(f"✅ PARSED SUCCESSFULLY ({len(courses)} courses found)")
-                for i, course in enumerate(courses, 1):
-                    help_text_str = f" ({
-                        course['help_text']})" if course['help_text'] else ""
-                    print(f"   {i}. {course['subject']} {course['number']} "
-                          f"[Min Grade: {course['min_grade']}]{help_text_str}")
-                    if course['logical_path'] or course['group_level'] > 0:
-                        print(f"      → Logical Path: {
-                              course['logical_path']}, Group Level: {course['group_level']}")
-
-            except Exception as e:
-                failed_parses += 1
-                error_msg = str(e)
-                print(f"❌ PARSE FAILED: {error_msg[:100]}...")
-
-                # Show some context for debugging
-                if len(prereq_text) > 100:
-                    print(f"   Text snippet: {prereq_text[:100]}...")
-
-                # Provide specific guidance for common issues
-                if "Unexpected token" in error_msg and "CLOSE_PAREN" in error_msg:
-                    print(f"   → Likely unbalanced parentheses issue")
-                elif "Unexpected token" in error_msg and "COURSE_NUMBER" in error_msg:
-                    print(f"   → Likely malformed course code (check spacing)")
-                elif "Unexpected token" in error_msg:
-                    print(f"   → Check for invalid characters or formatting")
-
-                # Show character-by-character breakdown for complex cases
-                if "(" in prereq_text or ")" in prereq_text:
-                    open_count = prereq_text.count('(')
-                    close_count = prereq_text.count(')')
-                    print(f"   → Parentheses: {
-                          open_count} open, {close_count} close")
-
-                # Check for suspicious course code patterns
-                import re
-                suspicious_courses = re.findall(
-                    r'\b[A-Z]+\d+\s+[A-Z0-9]\b', prereq_text)
-                if suspicious_courses:
-                    print(f"   → Suspicious course codes found: {
-                          suspicious_courses}")
-
-        # Parse Corequisites
-        if pd.notna(row['corequisites']) and str(row['corequisites']).strip():
-            corequisite_count += 1
-            coreq_text = str(row['corequisites']).strip()
-
-            print(f"COREQUISITES: {coreq_text}")
-
-            try:
-                # For corequisites, we'll use a simpler comma-based parsing for now
-                coreq_courses = []
-                for coreq in coreq_text.split(','):
-                    coreq = coreq.strip()
-                    if coreq:
-                        # Simple parsing for corequisites (usually just comma-separated)
-                        match = re.match(r'([A-Z]{2,5})\s+([A-Z0-9]+)', coreq)
-                        if match:
-                            coreq_courses.append({
-                                'subject': match.group(1),
-                                'number': match.group(2),
-                                'relationship_type': 'corequisite'
-                            })
-
-                print(f"✅ COREQUISITES PARSED ({
-                      len(coreq_courses)} courses found)")
-                for i, course in enumerate(coreq_courses, 1):
-                    print(f"   {i}. {course['subject']} {
-                          course['number']} (corequisite)")
-
-            except Exception as e:
-                print(f"❌ COREQUISITE PARSE FAILED: {str(e)[:100]}")
+    # Parse results by text, kept across chunks so each text is parsed once
+    parsed = {}
+    done = 0
+    # (course code, error) for each failed parse, reported after the run
+    failures = []
+    workers = max_workers or os.cpu_count() or 1
+
+    output_file = open(output, 'w', newline='') if output else nullcontext()
+    # Worker processes start with the first chunk large enough to need them
+    with reader, output_file, parse_worker_pool(
+            partial(_make_parse, engine), max_workers) as executor:
+        # In-process parse function for chunks too small for the pool
+        serial_parse = None
+        writer = csv.writer(output_file) if output else None
+        if writer:
+            writer.writerow(OUTPUT_COLUMNS)
+
+        for df in reader:
+            start = total_courses
+            total_courses += len(df)
+
+            # Null/empty checks and course codes for the chunk, computed once
+            prereq_col = df['prerequisites'].fillna('').str.strip()
+            coreq_col = df['corequisites'].fillna('').str.strip()
+            has_pre = prereq_col.ne('').to_numpy()
+            has_co = coreq_col.ne('').to_numpy()
+            subjects = df['subject_id'].to_numpy()
+            numbers = df['course_number'].to_numpy()
+            course_codes = (df['subject_id'] + ' ' + df['course_number']).to_numpy()
+            titles = df['title'].astype(str).to_numpy()
+            prereq_col = prereq_col.to_numpy()
+
+            # Corequisite courses by row label, matched over the column at once
+            coreq_matches = coreq_col.str.extractall(_COREQ_RE)
+            coreq_found = pd.Series(
+                list(zip(coreq_matches[0], coreq_matches[1])),
+                index=coreq_matches.index.get_level_values(0),
+            ).groupby(level=0).agg(list).to_dict()
+            coreq_col = coreq_col.to_numpy()
+
+            # Parse the chunk's new distinct prerequisite texts, across worker
+            # processes when there are enough of them
+            prereq_texts = [text for text in dict.fromkeys(prereq_col[has_pre])
+                            if text not in parsed]
+            if len(prereq_texts) < PARALLEL_PARSE_THRESHOLD:
+                if serial_parse is None:
+                    serial_parse = _make_parse(engine)
+                results = map(serial_parse, prereq_texts)
+            else:
+                chunksize = max(1, len(prereq_texts) // (workers * PARSE_CHUNKS_PER_WORKER))
+                results = executor.map(parse_in_worker, prereq_texts, chunksize=chunksize)
+            for text, (success, outcome, fixes) in zip(prereq_texts, results):
+                parsed[text] = success, outcome
+                course_code_fixes += fixes
+
+            # Per-course details and output rows are collected and written
+            # once per chunk
+            log_lines = []
+            output_rows = []
+            emit = log_lines.append if verbose else _discard
+
+            # Only rows with requisites need work; verbose output lists every course
+            rows = range(len(df)) if verbose else (has_pre | has_co).nonzero()[0]
+
+            # Process each course
+            for pos in rows:
+                done += 1
+                if not verbose and done % PROGRESS_EVERY == 0:
+                    print(f"Processed {done} courses with requisites")
+
+                # Row label in the whole file (chunks continue the index)
+                idx = start + pos
+
+                course_code = course_codes[pos]
+                title = titles[pos]
+                course_title = title[:50] + "..." if len(title) > 50 else title
+
+                emit(f"\n[{idx+1:4d}] {course_code}: {course_title}")
+                emit("-" * 80)
+
+                # Parse Prerequisites
+                if has_pre[pos]:
+                    prerequisite_count += 1
+                    prereq_text = prereq_col[pos]
+
+                    emit(f"PREREQUISITES: {prereq_text}")
+
+                    success, outcome = parsed[prereq_text]
+                    if success:
+                        courses = outcome
+                        successful_parses += 1
+                        if writer:
+                            output_rows.extend(
+                                (subjects[pos], numbers[pos], *course)
+                                for course in courses)
+
+                        emit(f"✅ PARSED SUCCESSFULLY ({len(courses)} courses found)")
+                        for i, course in enumerate(courses, 1):
+                            help_text_str = f" ({course.help_text})" if course.help_text else ""
+                            emit(f"   {i}. {course.subject} {course.number} "
+                                 f"[Min Grade: {course.min_grade}]{help_text_str}")
+                            if course.logical_path or course.group_level > 0:
+                                emit(f"      → Logical Path: {course.logical_path}, "
+                                     f"Group Level: {course.group_level}")
+
+                    else:
+                        failed_parses += 1
+                        error_msg = outcome
+                        failures.append((course_code, error_msg))
+                        emit(f"❌ PARSE FAILED: {error_msg[:100]}...")
+
+                        # Show some context for debugging
+                        if len(prereq_text) > 100:
+                            emit(f"   Text snippet: {prereq_text[:100]}...")
+
+                        # Provide specific guidance for common issues
+                        hint = _failure_hint(error_msg)
+                        if hint:
+                            emit(f"   → {hint}")
+
+                        # Show character-by-character breakdown for complex cases
+                        if "(" in prereq_text or ")" in prereq_text:
+                            open_count = prereq_text.count('(')
+                            close_count = prereq_text.count(')')
+                            emit(f"   → Parentheses: {open_count} open, {close_count} close")
+
+                        # Check for suspicious course code patterns
+                        suspicious_courses = _SUSP_RE.findall(prereq_text)
+                        if suspicious_courses:
+                            emit(f"   → Suspicious course codes found: {suspicious_courses}")
+
+                # Parse Corequisites
+                if has_co[pos]:
+                    corequisite_count += 1
+                    coreq_text = coreq_col[pos]
+
+                    emit(f"COREQUISITES: {coreq_text}")
+
+                    coreq_courses = coreq_found.get(idx, [])
+
+                    emit(f"✅ COREQUISITES PARSED ({len(coreq_courses)} courses found)")
+                    for i, (subject, number) in enumerate(coreq_courses, 1):
+                        emit(f"   {i}. {subject} {number} (corequisite)")
+
+            if log_lines:
+                sys.stdout.write('\n'.join(log_lines) + '\n')
+            if output_rows:
+                writer.writerows(output_rows)
+
+    print(f"Loaded {total_courses} courses from {filename}")
+    if output:
+        print(f"Parsed prerequisites saved to {output}")
+
+    # Verbose output already showed each failure in place
+    if failures and not verbose:
+        print(f"\n{'='*80}")
+        print("FAILED PARSES")
+        print(f"{'='*80}")
+        for course_code, error_msg in failures:
+            print(f"❌ {course_code}: {error_msg[:100]}")
 
     # Print summary statistics
     print(f"\n{'='*80}")
@@ -147,9 +306,10 @@ def parse_all_prerequisites():
     print(f"Courses with Corequisites:  {corequisite_count:,}")
     print(f"Successful Parses:       {successful_parses:,}")
     print(f"Failed Parses:           {failed_parses:,}")
+    print(f"Course Codes Fixed:      {course_code_fixes:,}")
     if prerequisite_count > 0:
-        print(f"Success Rate:            {
-              (successful_parses/prerequisite_count*100):.1f}%")
+        print(f"Success Rate:            "
+              f"{successful_parses/prerequisite_count*100:.1f}%")
 
 
 def test_comma_parsing():
@@ -183,10 +343,9 @@ def test_comma_parsing():
             courses = parser.extract_courses(ast)
             print(f"✅ SUCCESS - Found {len(courses)} courses:")
             for j, course in enumerate(courses, 1):
-                logical_path_str = f" → {
-                    course['logical_path']}" if course['logical_path'] else ""
-                print(f"   {j}. {course['subject']} {
-                      course['number']} [Min Grade: {course['min_grade']}]{logical_path_str}")
+                logical_path_str = f" → {course.logical_path}" if course.logical_path else ""
+                print(f"   {j}. {course.subject} {course.number} "
+                      f"[Min Grade: {course.min_grade}]{logical_path_str}")
             print(f"AST: {ast}")
         except Exception as e:
             print(f"❌ FAILED: {e}")
@@ -194,11 +353,28 @@ def test_comma_parsing():
 
 def main():
     """Main function to run the parser on courses.csv"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Parse all prerequisites and corequisites from courses.csv')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='Number of parser processes (default: one per CPU)')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Print the parsed requisites of every course')
+    parser.add_argument('-o', '--output',
+                        help='Write every parsed prerequisite to this CSV file')
+    parser.add_argument('--engine', choices=['descent', 'lark'], default='descent',
+                        help='Parser engine; lark is the reference LALR parser '
+                             '(default: descent)')
+
+    args = parser.parse_args()
+
     # First test comma parsing
     # test_comma_parsing()
 
     # Then run the full parsing
-    parse_all_prerequisites()
+    parse_all_prerequisites(max_workers=args.jobs, verbose=args.verbose,
+                            output=args.output, engine=args.engine)
 
 
 if __name__ == "__main__":
@@ -1,41 +1,30 @@
 import json
 import pandas as pd
-import re
 
 
 def create_coreq_mapping(csv_file):
-    df = pd.read_csv(csv_file)
+    df = pd.read_csv(csv_file,
+                     usecols=['id', 'subject_id', 'course_number', 'corequisites'],
+                     dtype=str)
 
     # Create a mapping of subject_id + course_number to id for quick lookup
-    course_lookup = {}
-    for _, row in df.iterrows():
-        key = f"{row['subject_id']}{row['course_number']}"
-        course_lookup[key] = row['id']
-
-    coreq_mapping = {}
-
-    for _, row in df.iterrows():
-        course_id = row['id']
-        coreq_text = row['corequisites']
-
-        # Skip if no corequisites
-        if pd.isna(coreq_text) or not coreq_text.strip():
-            continue
-
-        # Extract course codes from corequisites text
-        # This regex looks for patterns like "MATH 101", "CS 250", etc.
-        course_pattern = r'([A-Z]{2,4})\s*(\d{3,4})'
-        matches = re.findall(course_pattern, coreq_text)
-
-        coreq_ids = []
-        for subject, number in matches:
-            lookup_key = f"{subject}{number}"
-            if lookup_key in course_lookup:
-                coreq_ids.append(course_lookup[lookup_key])
-
-        # Only add to mapping if we found valid corequisite IDs
-        if coreq_ids:
-            coreq_mapping[course_id] = coreq_ids
+    keys = df['subject_id'].astype(str) + df['course_number'].astype(str)
+    course_lookup = dict(zip(keys.to_numpy(), df['id'].to_numpy()))
+
+    # Extract course codes from all corequisite texts in one pass
+    # This regex looks for patterns like "MATH 101", "CS 250", etc.
+    course_pattern = r'([A-Z]{2,4})\s*(\d{3,4})'
+    matches = df['corequisites'].str.extractall(course_pattern)
+
+    # Keep only codes that resolve to a known course, then collect the
+    # IDs per original row (row order and match order are preserved)
+    coreq_ids = (matches[0] + matches[1]).map(course_lookup).dropna()
+    coreq_ids_by_row = coreq_ids.groupby(level=0).agg(list)
+
+    # Only rows with valid corequisite IDs end up in the mapping
+    course_ids = df['id'].to_numpy()
+    coreq_mapping = {course_ids[row]: ids
+                     for row, ids in coreq_ids_by_row.items()}
 
     return coreq_mapping
 
@@ -1,9 +1,23 @@
-import pandas as pd
-import json
+import csv
+import os
+import orjson
 
-with open('./deps_graph.json', 'r') as file:
-    data = json.load(file)
+with open('./deps_graph.json', 'rb') as file:
+    data = orjson.loads(file.read())
 
-# This handles nested and irregular JSON structures
-df = pd.json_normalize(data)
-df.to_csv('output.csv', index=False)
+# A single object becomes one row, as pd.json_normalize would make it
+records = data if isinstance(data, list) else [data]
+
+if any(isinstance(value, dict) for record in records for value in record.values()):
+    # Nested objects need flattening into dotted columns
+    import pandas as pd
+
+    df = pd.json_normalize(data)
+    df.to_csv('output.csv', index=False)
+else:
+    # Flat records can be streamed straight to CSV without a DataFrame
+    fieldnames = list(dict.fromkeys(key for record in records for key in record))
+    with open('output.csv', 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames, lineterminator=os.linesep)
+        writer.writeheader()
+        writer.writerows(records)